@@ -2,14 +2,11 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-import threading
+import queue
+import functools
 import time
 import numpy as np
-import sounddevice as sd
-from scipy.signal import chirp
-import pyaudio
 from pydualsense import pydualsense
-from DualSenseHapticDataCollector import DualSenseHapticDataCollector
 import logging
 
 class HapticEnhanceApp:
@@ -29,14 +26,34 @@ class HapticEnhanceApp:
         self.chirp_duration = 0.15  # Duration in seconds (150ms)
         self.chirp_fs = 48000  # Sample rate (Hz)
         
-        # Store the generated chirp signal
-        self.chirp_audio_data = None
+        # Generated chirp (int16) for the left and right output channel
+        self.chirp_mono = None
+        
+        # Audio devices and chirp are only prepared once flexible-haptic is selected
+        self.audio_ready = False
+        
+        # Callback-driven output stream, kept open across chirp playbacks
+        self.stream = None
+        self.stream_device_index = None
+        self.chirp_requests = queue.SimpleQueue()  # Chirps queued by presses for the stream callback
+        self.active_chirp = None  # Chirp currently being played by the stream callback
+        self.playhead = 0  # Next sample of active_chirp to play
+        
+        # Button presses and releases from pydualsense's report thread, applied on the Tk thread
+        self.button_events = queue.SimpleQueue()
+        
+        # Second currently shown on the timestamp label
+        self.last_timestamp = 0
+        
+        # Pending Tk timer that turns the motors off after a fixed-haptic press
+        self.motor_off_job = None
         
         # Add working device storage
         self.working_dualsense_device = None
         self.dualsense_devices = []  # Initialize empty list for DualSense devices
         self.selected_device_index = tk.StringVar()  # Store selected device index
         self.selected_channel = tk.StringVar(value="0")  # Store selected channel
+        self.output_selection = None  # (device index, device name, channel) used for playback
         
         # Create main frame with padding
         self.main_frame = ttk.Frame(root)
@@ -51,9 +68,6 @@ class HapticEnhanceApp:
         # Control section
         self.create_control_section()
         
-        # Initialize audio devices
-        self.update_audio_devices()
-        
         # Initialize controller
         self.initialize_controller()
     
@@ -79,6 +93,8 @@ class HapticEnhanceApp:
         
         # Create a grid of labels for different buttons with smaller size
         self.button_labels = {}
+        self.button_texts = {}  # (not pressed, pressed) label text per button
+        self.button_shown = {}  # Pressed state each label currently shows
         buttons = [
             ('cross', '✕'), ('circle', '○'), ('triangle', '△'), ('square', '□'),
             ('dpad_up', '↑'), ('dpad_down', '↓'), ('dpad_left', '←'), ('dpad_right', '→')
@@ -91,6 +107,8 @@ class HapticEnhanceApp:
                             width=15, padding=2, font=("Arial", 9))  # Reduced width, padding and font
             label.grid(row=row, column=col, padx=5, pady=2)  # Reduced spacing
             self.button_labels[button] = label
+            self.button_texts[button] = (f"{symbol}: Not Pressed", f"{symbol}: Pressed")
+            self.button_shown[button] = False
     
     def create_control_section(self):
         # Control frame
@@ -121,6 +139,7 @@ class HapticEnhanceApp:
         
         self.device_selector = ttk.Combobox(device_selector_frame, textvariable=self.selected_device_index, state="readonly", width=40)
         self.device_selector.pack(side=tk.LEFT, padx=2)
+        self.device_selector.bind('<<ComboboxSelected>>', self.on_device_selected)
         
         # Channel selector
         channel_selector_frame = ttk.Frame(self.device_frame)
@@ -131,6 +150,7 @@ class HapticEnhanceApp:
         
         self.channel_selector = ttk.Combobox(channel_selector_frame, textvariable=self.selected_channel, state="readonly", width=10)
         self.channel_selector.pack(side=tk.LEFT, padx=2)
+        self.channel_selector.bind('<<ComboboxSelected>>', self.on_channel_selected)
         
         # Initially hide the device selector
         self.device_frame.pack_forget()
@@ -181,11 +201,12 @@ class HapticEnhanceApp:
             self.controller_connected = True
             self.status_label.config(text="Controller: Connected", foreground="green")
             
-            # Start controller input thread
-            self.controller_running = True
-            self.controller_thread = threading.Thread(target=self.controller_loop)
-            self.controller_thread.daemon = True
-            self.controller_thread.start()
+            # Let pydualsense notify us whenever a button changes state
+            self.register_button_events()
+            self.drain_button_events()
+            
+            # Keep the timestamp ticking on the Tk event loop
+            self.tick_timestamp()
             
         except Exception as e:
             print(f"Error initializing DualSense controller: {e}")
@@ -193,88 +214,90 @@ class HapticEnhanceApp:
             messagebox.showwarning("Controller Warning", 
                                 "DualSense controller not detected.")
     
-    def controller_loop(self):
-        # Track button states to detect press events (not holds)
-        button_states = {
-            'cross': False, 'circle': False, 'triangle': False, 'square': False,
-            'dpad_up': False, 'dpad_down': False, 'dpad_left': False, 'dpad_right': False
+    def register_button_events(self):
+        # Mapping from our button names to the pydualsense events that report them
+        button_event_map = {
+            'cross': 'cross_pressed',
+            'circle': 'circle_pressed',
+            'triangle': 'triangle_pressed',
+            'square': 'square_pressed',
+            'dpad_up': 'dpad_up',
+            'dpad_down': 'dpad_down',
+            'dpad_left': 'dpad_left',
+            'dpad_right': 'dpad_right'
         }
         
-        # Mapping from our button names to actual attribute names in DSState
-        button_attr_map = {
-            'cross': 'cross',
-            'circle': 'circle',
-            'triangle': 'triangle',
-            'square': 'square',
-            'dpad_up': 'DpadUp',
-            'dpad_down': 'DpadDown',
-            'dpad_left': 'DpadLeft',
-            'dpad_right': 'DpadRight'
-        }
+        for button, event_name in button_event_map.items():
+            event = getattr(self.dualsense, event_name)
+            event += functools.partial(self.on_button_event, button)
+    
+    def on_button_event(self, button, is_pressed):
+        """Called from the pydualsense report thread on every press and release"""
+        # Never call into Tk from here: the report thread would wait on the Tk thread
+        self.button_events.put((button, is_pressed))
+    
+    def drain_button_events(self):
+        """Apply the presses and releases queued by on_button_event, about once per frame"""
+        # Reschedule first, so an error in one update doesn't stop the display for good
+        if self.controller_connected:
+            self.root.after(16, self.drain_button_events)
         
-        while self.controller_running:
+        while True:
             try:
-                # Update timestamp
-                self.root.after(0, self.update_timestamp)
-                
-                # Check each button
-                for button, attr_name in button_attr_map.items():
-                    is_pressed = getattr(self.dualsense.state, attr_name)
-                    if is_pressed and not button_states[button]:
-                        # Button just pressed
-                        button_states[button] = True
-                        self.root.after(0, self.update_button_display, button, True)
-                    elif not is_pressed and button_states[button]:
-                        # Button just released
-                        button_states[button] = False
-                        self.root.after(0, self.update_button_display, button, False)
-                
-                time.sleep(0.05)  # Prevent high CPU usage
-                
-            except Exception as e:
-                print(f"Error reading controller input: {e}")
-                time.sleep(1)
+                button, is_pressed = self.button_events.get_nowait()
+            except queue.Empty:
+                break
+            self.update_button_display(button, is_pressed)
+    
+    def tick_timestamp(self):
+        """Refresh the timestamp label once per second from Tk's own timer"""
+        now = time.time()
+        self.update_timestamp(int(now))
+        # Wake just after the next second boundary so no second is skipped or repeated
+        self.root.after(1005 - int(now * 1000) % 1000, self.tick_timestamp)
     
-    def update_timestamp(self):
-        current_time = time.strftime("%H:%M:%S")
-        self.update_time_label.config(text=f"Last Update: {current_time}")
+    def update_timestamp(self, now=None):
+        if now is None:
+            now = int(time.time())
+        # The label only shows whole seconds, so skip it when the second is unchanged
+        if now == self.last_timestamp:
+            return
+        self.last_timestamp = now
+        self.update_time_label.config(text=time.strftime("Last Update: %H:%M:%S", time.localtime(now)))
     
     def update_button_display(self, button, is_pressed):
         if button in self.button_labels:
-            symbol = {
-                'cross': '✕', 'circle': '○', 'triangle': '△', 'square': '□',
-                'dpad_up': '↑', 'dpad_down': '↓', 'dpad_left': '←', 'dpad_right': '→'
-            }.get(button, button)
-            
-            color = "green" if is_pressed else "black"
-            self.button_labels[button].config(
-                text=f"{symbol}: {'Pressed' if is_pressed else 'Not Pressed'}",
-                foreground=color
-            )
+            # Skip the Tk reconfigure when the label already shows this state
+            if self.button_shown[button] != is_pressed:
+                self.button_shown[button] = is_pressed
+                self.button_labels[button].config(
+                    text=self.button_texts[button][is_pressed],
+                    foreground="green" if is_pressed else "black"
+                )
             
             # Handle haptic feedback based on mode
             if hasattr(self, 'dualsense') and self.controller_connected:
                 mode = self.haptic_mode.get()
                 if mode == "fixed-haptic" and is_pressed:
-                    # Start vibration in a separate thread
-                    def vibrate_thread():
-                        # Set both motors to lowest intensity (1)
-                        self.dualsense.setLeftMotor(1)
-                        self.dualsense.setRightMotor(1)
-                        # Wait for 150ms
-                        time.sleep(0.15)
-                        # Stop vibration
-                        self.dualsense.setLeftMotor(0)
-                        self.dualsense.setRightMotor(0)
-                    
-                    # Start vibration thread
-                    vibration_thread = threading.Thread(target=vibrate_thread)
-                    vibration_thread.daemon = True
-                    vibration_thread.start()
+                    # Run both motors at the lowest intensity (1) for 150ms
+                    self.set_motors(1)
+                    if self.motor_off_job is not None:
+                        self.root.after_cancel(self.motor_off_job)
+                    self.motor_off_job = self.root.after(150, self.stop_motors)
                 elif mode == "flexible-haptic" and is_pressed:
                     # Play chirp sound only when button is pressed (not held)
                     self.play_chirp()
     
+    def stop_motors(self):
+        """Scheduled 150ms after a fixed-haptic press to end the vibration"""
+        self.motor_off_job = None
+        self.set_motors(0)
+    
+    def set_motors(self, intensity):
+        """Set both rumble motors to the same intensity"""
+        self.dualsense.setLeftMotor(intensity)
+        self.dualsense.setRightMotor(intensity)
+    
     def on_haptic_mode_change(self):
         """Handle haptic mode changes"""
         mode = self.haptic_mode.get()
@@ -282,6 +305,7 @@ class HapticEnhanceApp:
         
         # Show/hide device selector based on mode
         if mode == "flexible-haptic":
+            self._ensure_audio_ready()
             self.device_frame.pack(fill="x", pady=2)
         else:
             self.device_frame.pack_forget()
@@ -311,6 +335,9 @@ class HapticEnhanceApp:
                     messagebox.showwarning("Warning", "Please enter a user name!")
                     return
                     
+                # Imported on first use: the collector pulls in sounddevice and pandas
+                from DualSenseHapticDataCollector import DualSenseHapticDataCollector
+                
                 # Simplified user_id using only the user name
                 self.collector = DualSenseHapticDataCollector(
                     controller=self.dualsense, 
@@ -346,22 +373,45 @@ class HapticEnhanceApp:
                 messagebox.showerror("Error", f"Failed to stop collection: {e}")
     
     def on_closing(self):
-        # Cleanup
-        self.controller_running = False
+        # Cleanup: stop applying controller events first
+        self.controller_connected = False
         if self.collector:
             try:
                 self.collector.stop_collection()
             except:
                 pass
         if hasattr(self, 'dualsense'):
+            # Don't leave the motors running if a fixed-haptic pulse is in progress
+            if self.motor_off_job is not None:
+                self.root.after_cancel(self.motor_off_job)
+                self.motor_off_job = None
+                try:
+                    self.set_motors(0)
+                except:
+                    pass
             try:
                 self.dualsense.close()
             except:
                 pass
+        self.close_audio_stream()
         self.root.destroy()
 
+    def _ensure_audio_ready(self):
+        """Scan audio devices and build the chirp the first time flexible-haptic is used"""
+        if self.audio_ready:
+            return
+        if self.chirp_mono is None:
+            self.generate_chirp()
+        # Selecting the default device also opens the output stream
+        self.update_audio_devices()
+        # Only skip later scans once playback works; otherwise selecting
+        # flexible-haptic again (e.g. after plugging in a device) rescans
+        self.audio_ready = self.chirp_mono is not None and self.stream is not None
+
     def update_audio_devices(self):
         """Get list of available audio output devices"""
+        # Audio is only needed in flexible-haptic mode, so sounddevice is imported here
+        import sounddevice as sd
         try:
             self.devices = sd.query_devices()
             self.dualsense_devices = []
@@ -382,20 +432,6 @@ class HapticEnhanceApp:
                         self.dualsense_devices.append(i)
                         device_options.append(f"{i}: {device_name}")
                         logging.info("  ✓ Can be used for audio playback")
-                        
-                        # Update channel selector when device is selected
-                        def update_channels(event):
-                            selected_option = self.selected_device_index.get()
-                            if selected_option:
-                                selected_index = int(selected_option.split(':')[0])
-                                device_info = self.devices[selected_index]
-                                channels = device_info['max_output_channels']
-                                channel_options = [str(i) for i in range(channels)]
-                                self.channel_selector['values'] = channel_options
-                                if channel_options:
-                                    self.channel_selector.set(channel_options[0])
-                        
-                        self.device_selector.bind('<<ComboboxSelected>>', update_channels)
                     else:
                         logging.info("  ✗ Cannot be used for audio playback (no output channels)")
                 else:
@@ -410,14 +446,8 @@ class HapticEnhanceApp:
                 self.device_selector['values'] = device_options
                 if device_options:
                     self.device_selector.set(device_options[0])  # Set default selection
-                    self.selected_device_index.set(device_options[0].split(':')[0])  # Set the index
-                    # Update channel selector for default device
-                    device_info = self.devices[int(device_options[0].split(':')[0])]
-                    channels = device_info['max_output_channels']
-                    channel_options = [str(i) for i in range(channels)]
-                    self.channel_selector['values'] = channel_options
-                    if channel_options:
-                        self.channel_selector.set(channel_options[0])
+                    # Update channel selector and cached selection for default device
+                    self.on_device_selected()
                     logging.info(f"\nSelected default output device: {device_options[0]}")
             
             logging.info("=== End of Device Scan ===\n")
@@ -426,104 +456,124 @@ class HapticEnhanceApp:
             logging.error(f"Error querying audio devices: {str(e)}")
             messagebox.showerror("Error", f"Failed to get audio devices: {str(e)}")
 
+    def on_device_selected(self, event=None):
+        """Refresh the channel list and cached output selection for the chosen device"""
+        selected_option = self.selected_device_index.get()
+        if not selected_option:
+            return
+        selected_index = int(selected_option.split(':')[0])
+        channels = self.devices[selected_index]['max_output_channels']
+        channel_options = [str(i) for i in range(channels)]
+        self.channel_selector['values'] = channel_options
+        if channel_options:
+            self.channel_selector.set(channel_options[0])
+        self.on_channel_selected()
+
+    def on_channel_selected(self, event=None):
+        """Cache the (device index, device name, channel) used by chirp playback"""
+        selected_option = self.selected_device_index.get()
+        if not selected_option:
+            return
+        selected_index = int(selected_option.split(':')[0])
+        device_info = self.devices[selected_index]
+        selected_channel = int(self.selected_channel.get())
+        
+        # Check if selected channel is valid
+        if selected_channel >= device_info['max_output_channels']:
+            logging.error(f"Selected channel {selected_channel} is not available (max: {device_info['max_output_channels']-1})")
+            messagebox.showerror("Error", "Selected channel is not available")
+            return
+        
+        self.output_selection = (selected_index, device_info['name'], selected_channel)
+        logging.info(f"Chirp output set to device [{selected_index}] {device_info['name']}, channel {selected_channel}")
+        self.open_output_stream(selected_index)
+
     def generate_chirp(self):
+        """Build the chirp once as int16 samples for each output channel"""
         try:
-            # If we already have generated audio data, return it
-            if self.chirp_audio_data is not None:
-                return self.chirp_audio_data
-            
-            # Generate new signal only on first call
             t = np.linspace(0, self.chirp_duration, int(self.chirp_fs * self.chirp_duration))
-            signal = chirp(t, f0=self.chirp_f0, f1=self.chirp_f1, t1=self.chirp_duration, method='linear')
-            multi_channel_signal = np.column_stack((signal, signal))
-            samples = (multi_channel_signal * 32767).astype(np.int16)
-            self.chirp_audio_data = samples.tobytes()  # Store the generated audio data
-            return self.chirp_audio_data
+            
+            # Linear chirp: cos(2*pi*(f0*t + k/2*t^2)), computed in place on one buffer
+            k = (self.chirp_f1 - self.chirp_f0) / self.chirp_duration
+            phase = t * t
+            phase *= 0.5 * k
+            phase += self.chirp_f0 * t
+            phase *= 2 * np.pi
+            signal = np.cos(phase, out=phase)
+            signal *= 32767
+            samples = signal.astype(np.int16)
+            
+            # Left and right mono playback share the same samples
+            self.chirp_mono = [samples, samples]
             
         except Exception as e:
             logging.error(f"Error generating chirp: {e}")
-            return None
+            self.chirp_mono = None
 
     def play_chirp(self):
-        """Play the chirp sound on the default audio device in a separate thread"""
-        # Start audio playback in a separate thread
-        audio_thread = threading.Thread(target=self._play_chirp_thread)
-        audio_thread.daemon = True  # Thread will exit when main program exits
-        audio_thread.start()
+        """Queue the chirp for the output stream callback on the selected channel"""
+        if self.stream is None or self.chirp_mono is None or self.output_selection is None:
+            logging.error("Audio output is not ready")
+            return
+        
+        # Use the precomputed left or right channel
+        self.chirp_requests.put(self.chirp_mono[self.output_selection[2] % 2])
 
-    def _play_chirp_thread(self):
-        """Thread function to handle the actual audio playback"""
+    def _audio_callback(self, outdata, frames, time_info, status):
+        """Output stream callback: copy the next block of the active chirp, or silence"""
+        # A new press restarts the chirp from the beginning
         try:
-            # Get the audio data (will generate only once)
-            audio_data = self.generate_chirp()
-            if audio_data is not None:
-                logging.info(f"Using stored audio data. Size: {len(audio_data)} bytes")
-                
-                try:
-                    # Initialize PyAudio
-                    p = pyaudio.PyAudio()
-                    
-                    # Get selected device index
-                    selected_option = self.selected_device_index.get()
-                    if not selected_option:
-                        logging.error("No audio device selected")
-                        return
-                        
-                    selected_index = int(selected_option.split(':')[0])
-                    device_info = p.get_device_info_by_index(selected_index)
-                    device_name = device_info["name"]
-                    max_channels = device_info["maxOutputChannels"]
-                    
-                    # Get selected channel
-                    selected_channel = int(self.selected_channel.get())
-                    
-                    # Check if device is actually an output device
-                    if max_channels == 0:
-                        logging.error(f"Device [{selected_index}] {device_name} is not an output device")
-                        messagebox.showerror("Error", f"Selected device is not an output device")
-                        return
-                    
-                    # Check if selected channel is valid
-                    if selected_channel >= max_channels:
-                        logging.error(f"Selected channel {selected_channel} is not available (max: {max_channels-1})")
-                        messagebox.showerror("Error", f"Selected channel is not available")
-                        return
-                    
-                    logging.info(f"Playing chirp on device [{selected_index}] {device_name}, channel {selected_channel}")
-                    
-                    # Convert stereo to mono for the selected channel
-                    samples = np.frombuffer(audio_data, dtype=np.int16)
-                    samples = samples.reshape(-1, 2)
-                    mono_samples = samples[:, selected_channel % 2].astype(np.int16)  # Use left or right channel
-                    audio_data = mono_samples.tobytes()
-                    
-                    # Open stream
-                    stream = p.open(
-                        format=pyaudio.paInt16,
-                        channels=1,  # Always use mono for single channel playback
-                        rate=self.chirp_fs,
-                        output=True,
-                        output_device_index=selected_index,
-                        frames_per_buffer=2048
-                    )
-                    
-                    # Play audio
-                    stream.write(audio_data)
-                    
-                    # Close stream and PyAudio
-                    stream.stop_stream()
-                    stream.close()
-                    p.terminate()
-                    
-                    logging.info(f"Successfully played chirp on device [{selected_index}] {device_name}, channel {selected_channel}")
-                    
-                except Exception as e:
-                    logging.error(f"Error playing on device [{selected_index}], channel {selected_channel}: {str(e)}")
-                    messagebox.showerror("Error", f"Failed to play audio: {str(e)}")
-                
+            while True:
+                self.active_chirp = self.chirp_requests.get_nowait()
+                self.playhead = 0
+        except queue.Empty:
+            pass
+        
+        chirp = self.active_chirp
+        if chirp is None:
+            outdata.fill(0)
+            return
+        
+        block = chirp[self.playhead:self.playhead + frames]
+        count = len(block)
+        outdata[:count, 0] = block
+        outdata[count:] = 0
+        self.playhead += count
+        if self.playhead >= len(chirp):
+            self.active_chirp = None
+
+    def open_output_stream(self, device_index):
+        """Open the output stream on the given device, unless it is already open there"""
+        if self.stream is not None and self.stream_device_index == device_index:
+            return
+        
+        import sounddevice as sd
+        self.close_audio_stream()
+        try:
+            self.stream = sd.OutputStream(
+                samplerate=self.chirp_fs,
+                channels=1,  # Always use mono for single channel playback
+                dtype='int16',
+                device=device_index,
+                callback=self._audio_callback
+            )
+            self.stream.start()
+            self.stream_device_index = device_index
         except Exception as e:
-            logging.error(f"Error playing chirp: {e}")
-            messagebox.showerror("Error", f"Failed to play chirp: {e}")
+            logging.error(f"Error opening audio stream on device [{device_index}]: {e}")
+            messagebox.showerror("Error", f"Failed to open audio device: {e}")
+            self.stream = None
+
+    def close_audio_stream(self):
+        """Stop and close the output stream, if one is open"""
+        if self.stream is not None:
+            try:
+                self.stream.stop()
+                self.stream.close()
+            except Exception as e:
+                logging.error(f"Error closing audio stream: {e}")
+            self.stream = None
+            self.stream_device_index = None
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -1,11 +1,15 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
+import concurrent.futures
+import queue
 import time
 import os
+import sys
 import datetime
-from pydualsense import pydualsense
-from DualSenseHapticDataCollector import DualSenseHapticDataCollector
+import operator
+import collections
+import logging
 
 class LongApp:
     def __init__(self, root):
@@ -18,10 +22,55 @@ class LongApp:
         self.dualsense = None
         self.collector = None
         
+        # Controller polling intervals (seconds): poll fast for a short while
+        # after a press or release, and back off when the controller is idle
+        self.active_poll_interval = 0.001
+        self.idle_poll_interval = 0.02
+        self.active_poll_window = 0.2
+        
+        # Timestamp label: last text shown, the cached local UTC offset (seconds)
+        # and the minute (seconds since the epoch // 60) it was looked up in
+        self.timestamp_text = None
+        self.utc_offset = None
+        self.utc_offset_minute = None
+        
+        # Button edges and error messages from the poll thread, consumed on the Tk thread
+        self.controller_events = queue.SimpleQueue()
+        
+        # Controller connection, opened on a worker thread by initialize_controller
+        self.controller_init_thread = None
+        self.controller_init_error = None
+        
+        # Set to stop the poll thread; also wakes it from its wait immediately
+        self.controller_stop = threading.Event()
+        self.controller_thread = None
+        
+        # Changes of a button sooner than this after its last reported change are treated
+        # as switch bounce; the settled state is reported once the interval has passed
+        self.debounce_interval = 0.08
+        
+        # Controller read errors: recent ones kept in memory, reported at most once per second
+        self.logger = logging.getLogger("pad")
+        self.error_ring = collections.deque(maxlen=100)
+        self.last_error_time = 0.0
+        
+        # Collector start/stop opens and flushes files, so it runs off the Tk thread;
+        # while one is in progress the toggle button stays disabled
+        self.collector_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.collector_busy = False
+        
+        # Set by on_closing; stops watching for collector results
+        self.closing = False
+        
         # Recording state
         self.recording = False
         self.waiting_for_next = False
         self.current_button_index = 0
+        
+        # Pre-recording countdown: start time on the monotonic clock and pending tick
+        self.countdown_seconds = 2
+        self.countdown_start = 0.0
+        self.countdown_job = None
         self.button_sequence = ['cross', 'circle', 'triangle', 'square']
         self.button_symbols = {
             'cross': '✕',
@@ -37,6 +86,12 @@ class LongApp:
             'pressed': 'green'
         }
         
+        # Label texts per button, indexed by is_pressed: (not pressed, pressed)
+        self.label_texts = {
+            button: (f"{symbol}: Not Pressed", f"{symbol}: Pressed")
+            for button, symbol in self.button_symbols.items()
+        }
+        
         # Create main frame
         self.main_frame = ttk.Frame(root, padding=10)
         self.main_frame.pack(expand=True, fill="both")
@@ -46,7 +101,7 @@ class LongApp:
         self.create_button_display_section()
         self.create_control_section()
         
-        # Initialize controller
+        # Initialize controller in the background, so it doesn't hold up the first paint
         self.initialize_controller()
     
     def create_status_section(self):
@@ -63,6 +118,14 @@ class LongApp:
         self.update_time_label = ttk.Label(status_frame, text="Last Update: Never",
                                          font=("Arial", 10))
         self.update_time_label.pack(pady=2)
+        
+        # Non-modal banner for controller errors
+        self.banner_label = ttk.Label(status_frame, text="", foreground="red", font=("Arial", 10))
+        self.banner_label.pack(pady=2)
+    
+    def set_banner(self, message, color="red"):
+        """Show a controller message in the status banner without blocking the event loop"""
+        self.banner_label.config(text=message, foreground=color)
     
     def create_button_display_section(self):
         # Button display frame
@@ -71,6 +134,7 @@ class LongApp:
         
         # Create a grid of labels for different buttons in controller layout
         self.button_labels = {}
+        self.label_cache = {}  # Last (text, color) applied to each button label
         
         # Define button positions in a 3x3 grid (controller layout)
         button_positions = {
@@ -134,63 +198,194 @@ class LongApp:
         self.status_message.pack(pady=2)
     
     def initialize_controller(self):
+        """Connect to the controller on a worker thread so the window can draw meanwhile"""
+        self.controller_init_thread = threading.Thread(target=self.connect_controller, name="pad-init")
+        self.controller_init_thread.daemon = True
+        self.controller_init_thread.start()
+        self.root.after(50, self.finish_controller_init)
+    
+    def connect_controller(self):
+        """Worker thread: import pydualsense and open the controller (no Tk calls here)"""
         try:
-            self.dualsense = pydualsense()
-            self.dualsense.init()
-            self.controller_connected = True
-            self.status_label.config(text="Controller: Connected", foreground="green")
+            # Imported here so the HID stack doesn't delay the first window paint
+            from pydualsense import pydualsense
             
-            # Start controller input thread
-            self.controller_running = True
-            self.controller_thread = threading.Thread(target=self.controller_loop)
-            self.controller_thread.daemon = True
-            self.controller_thread.start()
+            dualsense = pydualsense()
+            dualsense.init()
+            self.dualsense = dualsense
             
         except Exception as e:
-            print(f"Error initializing DualSense controller: {e}")
+            self.controller_init_error = e
+    
+    def finish_controller_init(self):
+        """Once connect_controller is done, start polling the controller from the Tk side"""
+        if self.controller_init_thread.is_alive():
+            self.root.after(50, self.finish_controller_init)
+            return
+        
+        if self.controller_init_error is not None:
             self.status_label.config(text="Controller: Error", foreground="red")
-            messagebox.showwarning("Controller Warning", 
-                                "DualSense controller not detected.")
+            self.set_banner(f"DualSense controller not detected: {self.controller_init_error}")
+            return
+        
+        self.controller_connected = True
+        self.status_label.config(text="Controller: Connected", foreground="green")
+        
+        # Start controller input thread
+        self.controller_thread = threading.Thread(target=self.controller_loop, name="pad-poll")
+        self.controller_thread.daemon = True
+        self.controller_thread.start()
+        
+        # Apply queued controller events on the Tk thread
+        self.pre_redraw_poll()
+        
+        # Keep the timestamp ticking from Tk's own timer
+        self.update_timestamp()
+    
+    def raise_poll_priority(self):
+        """Best effort: run the calling (poll) thread at raised priority so it wakes promptly"""
+        try:
+            if sys.platform == "win32":
+                import ctypes
+                kernel32 = ctypes.windll.kernel32
+                kernel32.SetThreadPriority(kernel32.GetCurrentThread(), 1)  # THREAD_PRIORITY_ABOVE_NORMAL
+            elif hasattr(os, "sched_setscheduler"):
+                # Applies to the calling thread on Linux; usually needs CAP_SYS_NICE
+                os.sched_setscheduler(0, os.SCHED_RR, os.sched_param(20))
+        except (OSError, AttributeError) as e:
+            self.logger.debug("Could not raise poll thread priority: %s", e)
     
     def controller_loop(self):
-        # Track button states to detect press events
-        button_states = {
-            'cross': False, 'circle': False, 'triangle': False, 'square': False
-        }
+        self.raise_poll_priority()
+        
+        # Reads all watched button fields of the controller state in one call, to keep the
+        # per-pass overhead low. It is not atomic: pydualsense's report thread assigns the
+        # fields one by one, so a snapshot can mix two reports; the debounce below settles that.
+        # A button's id is its index in button_sequence; button i is bit (1 << i)
+        # in the pressed-state masks below.
+        snapshot_buttons = operator.attrgetter(*self.button_sequence)
+        button_bits = [1 << i for i in range(len(self.button_sequence))]
+        
+        # Pressed-state mask read on the previous pass, and the one last reported to Tk
+        prev_mask = 0
+        reported_mask = 0
         
-        while self.controller_running:
+        # Time of the last press or release, used to pick the polling interval
+        last_edge_time = 0.0
+        
+        # Time of the last reported press or release per button, for debouncing
+        last_report_time = [0.0] * len(button_bits)
+        
+        # Whether the error banner is up, so it can be cleared once reads work again
+        banner_shown = False
+        
+        while not self.controller_stop.is_set():
             try:
-                # Update timestamp
-                self.root.after(0, self.update_timestamp)
+                # Edges seen during this poll, handed to Tk in a single callback
+                edges = []
+                
+                # Re-check the buttons until a full pass sees no change, so a quick
+                # press and release within one polling interval are both handled
+                for attempt in range(8):
+                    snap = snapshot_buttons(self.dualsense.state)
+                    mask = 0
+                    for bit, is_pressed in zip(button_bits, snap):
+                        if is_pressed:
+                            mask |= bit
+                    
+                    now = time.monotonic()
+                    if mask != prev_mask:
+                        prev_mask = mask
+                        last_edge_time = now
+                    elif attempt or mask == reported_mask:
+                        # No new change, and nothing held back still to check this poll
+                        break
+                    
+                    # Visit only the buttons whose state differs from what Tk was last told
+                    changed = mask ^ reported_mask
+                    while changed:
+                        bit = changed & -changed
+                        changed ^= bit
+                        i = bit.bit_length() - 1
+                        if now - last_report_time[i] < self.debounce_interval:
+                            # Possibly bouncing, in either direction: hold it back, and report
+                            # the state it settled in on a later pass once the interval is over
+                            continue
+                        last_report_time[i] = now
+                        reported_mask ^= bit
+                        edges.append((i, bool(mask & bit)))
                 
-                # Check each button
-                for button in button_states.keys():
-                    is_pressed = getattr(self.dualsense.state, button)
-                    if is_pressed and not button_states[button]:
-                        # Button just pressed
-                        button_states[button] = True
-                        self.root.after(0, self.update_button_display, button, True)
-                        if self.recording and button == self.button_sequence[self.current_button_index]:
-                            self.handle_button_press(button)
-                    elif not is_pressed and button_states[button]:
-                        # Button just released
-                        button_states[button] = False
-                        self.root.after(0, self.update_button_display, button, False)
+                # The poll thread never touches Tk; the UI side drains this queue
+                if edges:
+                    self.controller_events.put((self.apply_controller_updates, edges))
+                if banner_shown:
+                    banner_shown = False
+                    self.controller_events.put((self.set_banner, ""))
                 
-                time.sleep(0.05)  # Prevent high CPU usage
+                # Poll fast while a press is in flight, slower when idle to save CPU
+                if time.monotonic() - last_edge_time < self.active_poll_window:
+                    poll_interval = self.active_poll_interval
+                else:
+                    poll_interval = self.idle_poll_interval
+                if self.controller_stop.wait(poll_interval):
+                    break
                 
             except Exception as e:
-                print(f"Error reading controller input: {e}")
-                time.sleep(1)
+                self.error_ring.append((time.time(), repr(e)))
+                now = time.monotonic()
+                if now - self.last_error_time > 1.0:
+                    self.last_error_time = now
+                    self.logger.warning("pad read: %s", e)
+                    self.controller_events.put((self.set_banner, f"Error reading controller input: {e}"))
+                    banner_shown = True
+                else:
+                    # Back off only when errors keep repeating
+                    self.controller_stop.wait(1)
+    
+    def pre_redraw_poll(self):
+        """Apply controller events queued by the poll thread and paint them before yielding to Tk"""
+        applied = False
+        try:
+            while True:
+                # Each event is a (handler, argument) pair to run on this thread
+                handler, arg = self.controller_events.get_nowait()
+                handler(arg)
+                applied = True
+        except queue.Empty:
+            pass
+        
+        # Flush the pending label redraws now instead of waiting for Tk to go idle
+        if applied:
+            self.root.update_idletasks()
+        
+        if not self.controller_stop.is_set():
+            self.root.after(5, self.pre_redraw_poll)
+    
+    def apply_controller_updates(self, edges):
+        """Apply the (button id, is_pressed) edges one controller poll observed, on the Tk thread"""
+        for button_id, is_pressed in edges:
+            self.update_button_display(self.button_sequence[button_id], is_pressed)
+            if is_pressed and self.recording:
+                self.handle_button_press(button_id)
     
     def update_timestamp(self):
-        current_time = time.strftime("%H:%M:%S")
-        self.update_time_label.config(text=f"Last Update: {current_time}")
+        """Refresh the timestamp label, then reschedule itself once per second"""
+        now = time.time()
+        t = int(now)
+        # Local UTC offset, refreshed once a minute so DST changes are picked up
+        if t // 60 != self.utc_offset_minute:
+            self.utc_offset_minute = t // 60
+            self.utc_offset = time.localtime(t).tm_gmtoff
+        t += self.utc_offset
+        text = f"Last Update: {t // 3600 % 24:02d}:{t // 60 % 60:02d}:{t % 60:02d}"
+        if text != self.timestamp_text:
+            self.timestamp_text = text
+            self.update_time_label.config(text=text)
+        # Wake just after the next second boundary so no second is skipped or repeated
+        self.root.after(1005 - int(now * 1000) % 1000, self.update_timestamp)
     
     def update_button_display(self, button, is_pressed):
         if button in self.button_labels:
-            symbol = self.button_symbols[button]
-            
             # Determine the color based on button state
             if is_pressed:
                 color = self.button_colors['pressed']
@@ -199,13 +394,20 @@ class LongApp:
             else:
                 color = self.button_colors['normal']
             
+            # Skip the Tk call when the label already shows this text and color
+            text = self.label_texts[button][is_pressed]
+            if self.label_cache.get(button) == (text, color):
+                return
+            self.label_cache[button] = (text, color)
+            
             self.button_labels[button].config(
-                text=f"{symbol}: {'Pressed' if is_pressed else 'Not Pressed'}",
+                text=text,
                 foreground=color
             )
     
-    def handle_button_press(self, button):
-        if button == self.button_sequence[self.current_button_index]:
+    def handle_button_press(self, button_id):
+        # The expected button's id is the current position in the sequence
+        if button_id == self.current_button_index:
             self.current_button_index += 1
             if self.current_button_index < len(self.button_sequence):
                 self.root.after(400, self.prompt_next_button)  # 0.4 second delay
@@ -241,7 +443,8 @@ class LongApp:
             # Create output directory if it doesn't exist
             os.makedirs(output_dir, exist_ok=True)
             
-            # Initialize collector
+            # Initialize collector (imported on first use; it pulls in the audio stack)
+            from DualSenseHapticDataCollector import DualSenseHapticDataCollector
             self.collector = DualSenseHapticDataCollector(
                 controller=self.dualsense,
                 output_dir=output_dir,
@@ -249,16 +452,55 @@ class LongApp:
             )
             
             # Start countdown
-            self.prompt_label.config(text="Starting in 2...")
-            self.root.after(1000, lambda: self.prompt_label.config(text="Starting in 1..."))
-            self.root.after(2000, self.begin_recording)
+            self.countdown_start = time.monotonic()
+            self.tick_countdown()
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to start recording: {e}")
     
+    def tick_countdown(self):
+        """Update the countdown from the elapsed monotonic time, then begin recording when it runs out"""
+        elapsed = time.monotonic() - self.countdown_start
+        if elapsed >= self.countdown_seconds:
+            self.countdown_job = None
+            self.begin_recording()
+            return
+        
+        text = f"Starting in {self.countdown_seconds - int(elapsed)}..."
+        if self.prompt_label.cget("text") != text:
+            self.prompt_label.config(text=text)
+        self.countdown_job = self.root.after(50, self.tick_countdown)
+    
+    def cancel_countdown(self):
+        """Cancel a pending countdown, if any"""
+        if self.countdown_job is not None:
+            self.root.after_cancel(self.countdown_job)
+            self.countdown_job = None
+            self.prompt_label.config(text="")
+    
     def begin_recording(self):
+        self.status_message.config(text="Starting collection...")
+        self.collector_busy = True
+        self.toggle_button.state(['disabled'])
+        future = self.collector_executor.submit(self.collector.start_collection)
+        self.watch_collector_job(future, self.on_collection_started)
+    
+    def watch_collector_job(self, future, callback):
+        """Run callback(future) on the Tk thread once the collector job is done"""
+        # Polled from Tk so the worker never calls into Tk itself
+        if self.closing:
+            return
+        if future.done():
+            callback(future)
+        else:
+            self.root.after(50, self.watch_collector_job, future, callback)
+    
+    def on_collection_started(self, future):
+        """Finish starting a recording once the collector is running"""
+        self.collector_busy = False
+        self.enable_toggle()
         try:
-            self.collector.start_collection()
+            future.result()
             self.recording = True
             self.current_button_index = 0
             self.toggle_button.config(text="Stop Recording")
@@ -269,32 +511,68 @@ class LongApp:
             messagebox.showerror("Error", f"Failed to start collection: {e}")
             self.recording = False
             self.toggle_button.config(text="Start Recording")
+            self.status_message.config(text="")
     
     def stop_recording(self):
+        self.cancel_countdown()
         if self.collector:
-            try:
-                self.collector.stop_collection()
-                self.recording = False
-                self.toggle_button.config(text="Start Recording")
-                self.prompt_label.config(text="")
-                self.status_message.config(text="Recording completed and files saved!")
-                
-                # Reset button displays
-                for button in self.button_labels:
-                    self.update_button_display(button, False)
-                
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to stop recording: {e}")
+            # Stop counting presses right away; the files are flushed in the background
+            self.recording = False
+            self.prompt_label.config(text="")
+            self.status_message.config(text="Saving files...")
+            self.collector_busy = True
+            self.toggle_button.state(['disabled'])
+            future = self.collector_executor.submit(self.collector.stop_collection)
+            self.watch_collector_job(future, self.on_collection_stopped)
+    
+    def on_collection_stopped(self, future):
+        """Update the UI once the collector has stopped and saved its files"""
+        self.collector_busy = False
+        self.enable_toggle()
+        try:
+            future.result()
+            self.toggle_button.config(text="Start Recording")
+            self.status_message.config(text="Recording completed and files saved!")
+            
+            # Reset button displays
+            for button in self.button_labels:
+                self.update_button_display(button, False)
+            
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to stop recording: {e}")
     
     def toggle_recording(self):
-        if not self.recording:
+        # Ignore repeated clicks on the toggle button for a short while
+        self.toggle_button.state(['disabled'])
+        self.root.after(300, self.enable_toggle)
+        
+        if self.countdown_job is not None:
+            # Clicked during the countdown: abort it
+            self.cancel_countdown()
+        elif not self.recording:
             self.start_recording()
         else:
             self.stop_recording()
     
+    def enable_toggle(self):
+        """Re-enable the toggle button, unless the collector is still starting or stopping"""
+        if not self.collector_busy:
+            self.toggle_button.state(['!disabled'])
+    
     def on_closing(self):
-        # Cleanup
-        self.controller_running = False
+        # Cleanup: wake the poll thread and let it exit before closing the controller;
+        # a connection still being opened is given a moment to finish first
+        self.cancel_countdown()
+        self.controller_stop.set()
+        if self.controller_init_thread is not None:
+            self.controller_init_thread.join(timeout=1.0)
+        if self.controller_thread:
+            self.controller_thread.join(timeout=0.1)
+        # Drop a queued collector start/stop and let a running one finish, so the stop
+        # below also ends a recording that was still starting. The worker never calls
+        # into Tk, so waiting for it here can't deadlock
+        self.closing = True
+        self.collector_executor.shutdown(wait=True, cancel_futures=True)
         if self.collector:
             try:
                 self.collector.stop_collection()
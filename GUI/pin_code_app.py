@@ -1,18 +1,52 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk
 import threading
+import queue
+import functools
+import logging
 import time
+import hashlib
+import hmac
+import secrets
 from pydualsense import pydualsense
 from DualSenseDataCollector import DualSenseDataCollector
 
+logger = logging.getLogger(__name__)
+
+# D-pad navigation on the number pad, as (button, direction) -> next button.
+# Button ids: digits 0-9, -1 delete, -2 clear, -3 save/verify.
+# Moves that are not listed leave the highlight where it is.
+# Number pad layout:
+# 1 2 3
+# 4 5 6
+# 7 8 9
+# ⌫ 0 Clear
+# save_btn
+NUMPAD_TRANSITIONS = {
+    (1, 'up'): -1, (1, 'down'): 4, (1, 'right'): 2,
+    (2, 'up'): 0, (2, 'down'): 5, (2, 'left'): 1, (2, 'right'): 3,
+    (3, 'up'): -2, (3, 'down'): 6, (3, 'left'): 2,
+    (4, 'up'): 1, (4, 'down'): 7, (4, 'right'): 5,
+    (5, 'up'): 2, (5, 'down'): 8, (5, 'left'): 4, (5, 'right'): 6,
+    (6, 'up'): 3, (6, 'down'): 9, (6, 'left'): 5,
+    (7, 'up'): 4, (7, 'down'): -1, (7, 'right'): 8,
+    (8, 'up'): 5, (8, 'down'): 0, (8, 'left'): 7, (8, 'right'): 9,
+    (9, 'up'): 6, (9, 'down'): -2, (9, 'left'): 8,
+    (0, 'up'): 8, (0, 'down'): -3, (0, 'left'): -1, (0, 'right'): -2,
+    (-1, 'up'): 7, (-1, 'down'): -3, (-1, 'right'): 0,
+    (-2, 'up'): 9, (-2, 'down'): -3, (-2, 'left'): 0,
+    (-3, 'up'): 0,
+}
+
 class PINCodeApp:
     def __init__(self, root):
         self.root = root
         self.root.title("PIN Code Application")
         self.root.geometry("400x600")
         
-        # PIN code storage
-        self.saved_pin = ""
+        # PIN code storage: only a salted hash of the saved PIN is kept
+        self.pin_salt = b""
+        self.saved_pin_hash = None
         
         # Variables for PIN inputs
         self.set_pin = tk.StringVar()
@@ -24,7 +58,45 @@ class PINCodeApp:
         
         # Selected number for controller navigation
         self.selected_number = 5  # Start in the middle (5)
-        self.number_buttons = {}  # Store references to number buttons
+        # Number pad buttons keyed by (tab index, button id): digits 0-9, -1 delete, -2 clear, -3 save/verify
+        self.number_buttons = {}
+        self.highlighted_button = None  # Button currently drawn as selected
+        self.highlighted_style = None  # Its normal style, restored when the selection moves
+        self.highlight_pending = False  # A highlight refresh is scheduled for the next idle cycle
+        
+        # Controller lifecycle; set up by initialize_controller, torn down by on_closing
+        self.dualsense = None
+        self.collector = None
+        self.controller_init_thread = None
+        self.controller_init_error = None
+        self.controller_connected = False
+        
+        # Every press and release reported by pydualsense is queued for the Tk thread,
+        # so presses shorter than the drain interval are never lost
+        self.controller_events = queue.SimpleQueue()
+        # Controller buttons in bit order: (pydualsense event, log message, action, action args)
+        self.button_table = [
+            # D-pad for navigation
+            ('dpad_up', "D-pad UP", self.move_highlight, ("up",)),
+            ('dpad_down', "D-pad DOWN", self.move_highlight, ("down",)),
+            ('dpad_left', "D-pad LEFT", self.move_highlight, ("left",)),
+            ('dpad_right', "D-pad RIGHT", self.move_highlight, ("right",)),
+            # Cross confirms the selection, triangle deletes, circle clears
+            ('cross_pressed', "CROSS", self.handle_selected_button, ()),
+            ('triangle_pressed', "TRIANGLE", self.delete_digit, ()),
+            ('circle_pressed', "CIRCLE", self.clear_input, ()),
+            # Rectangle switches text field focus
+            ('square_pressed', "RECTANGLE/SQUARE", self.switch_text_field, ()),
+        ]
+        # The D-pad rows (bits 0-3) auto-repeat while held
+        self.repeat_mask = 0b1111
+        self.repeat_delay = 0.25
+        self.repeat_interval = 0.1
+        
+        # Pressed buttons as a bitmask (bit i is button_table[i]), to detect press events (not holds)
+        self.pressed_mask = 0
+        # Held D-pad directions auto-repeat like a keyboard: bit index -> time of the next repeat
+        self.next_repeat = {}
         
         # Create tabbed interface
         self.tab_control = ttk.Notebook(root)
@@ -39,10 +111,26 @@ class PINCodeApp:
         
         self.tab_control.pack(expand=1, fill="both")
         
+        # Index of the selected tab, kept current by <<NotebookTabChanged>>
+        self.current_tab_idx = 0
+        self.tab_control.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        
+        # Whether the window has keyboard focus, to pick the controller drain rate
+        self.window_active = True
+        self.root.bind("<FocusIn>", lambda event: setattr(self, 'window_active', True))
+        self.root.bind("<FocusOut>", lambda event: setattr(self, 'window_active', False))
+        
+        # Number pad button styles; "Selected." variants mark the controller selection
+        self.create_button_styles()
+        
         # Build the UI for each tab
         self.build_set_pin_tab()
         self.build_verify_pin_tab()
         
+        # Non-modal feedback shown over the bottom of the window; see show_toast
+        self.toast_label = tk.Label(root, text="", fg="white", wraplength=360, padx=10, pady=5)
+        self.toast_job = None
+        
         # Initialize highlighting
         self.update_button_highlight()
         
@@ -51,6 +139,14 @@ class PINCodeApp:
 
 
     
+    def create_button_styles(self):
+        style = ttk.Style(self.root)
+        style.configure("Numpad.TButton", font=("Arial", 14, "bold"), padding=(0, 10))
+        style.configure("Action.TButton", font=("Arial", 12), padding=(0, 8))
+        for name in ("Numpad.TButton", "Action.TButton"):
+            # Use a much more noticeable color and effect for the selected button
+            style.configure("Selected." + name, foreground="red", relief=tk.SUNKEN)
+    
     def build_set_pin_tab(self):
         # Title
         tk.Label(self.set_tab, text="Set PIN Code", font=("Arial", 16)).pack(pady=10)
@@ -69,58 +165,7 @@ class PINCodeApp:
         self.confirm_entry = tk.Entry(entry_frame, textvariable=self.confirm_pin, show="*", width=10, font=("Arial", 14))
         self.confirm_entry.grid(row=1, column=1, padx=5, pady=5)
         
-        # Number pad
-        numpad_frame = tk.Frame(self.set_tab)
-        numpad_frame.pack(pady=20)
-        
-        # Create number buttons (0-9)
-        button_font = ("Arial", 14, "bold")
-        for i in range(1, 10):
-            row = (i-1) // 3
-            col = (i-1) % 3
-            btn = tk.Button(numpad_frame, text=str(i), width=5, height=2, font=button_font, 
-                          command=lambda num=i: self.append_digit(num),
-                          bg="light gray", relief=tk.RAISED)
-            btn.grid(row=row, column=col, padx=5, pady=5)
-            self.number_buttons[i] = btn
-        
-        # Button for 0
-        zero_btn = tk.Button(numpad_frame, text="0", width=5, height=2, font=button_font, 
-                command=lambda: self.append_digit(0),
-                bg="light gray", relief=tk.RAISED)
-        zero_btn.grid(row=3, column=1, padx=5, pady=5)
-        self.number_buttons[0] = zero_btn
-        
-        # Delete button (left)
-        del_btn = tk.Button(numpad_frame, text="⌫", width=5, height=2, font=button_font, 
-                command=self.delete_digit,
-                bg="light gray", relief=tk.RAISED)
-        del_btn.grid(row=3, column=0, padx=5, pady=5)
-        self.number_buttons[-1] = del_btn  # Use -1 to represent delete
-        
-        # Clear button (right)
-        clear_btn = tk.Button(numpad_frame, text="Clear", width=5, height=2, font=button_font, 
-                command=self.clear_input,
-                bg="light gray", relief=tk.RAISED)
-        clear_btn.grid(row=3, column=2, padx=5, pady=5)
-        self.number_buttons[-2] = clear_btn  # Use -2 to represent clear
-        
-        # Save button
-        save_btn = tk.Button(self.set_tab, text="Save PIN", width=15, height=2, font=("Arial", 12),
-                          command=self.save_pin_code,
-                          bg="light gray", relief=tk.RAISED)
-        save_btn.pack(pady=20)
-        self.number_buttons[-3] = save_btn  # Use -3 to represent save
-        
-        # Instructions label
-        instructions = (
-            "DualSense Controls:\n"
-            "• Use D-pad to navigate the number pad\n"
-            "• Press ✕ to enter the highlighted number\n"
-            "• Press △ to delete\n"
-            "• Press ○ to clear"
-        )
-        tk.Label(self.set_tab, text=instructions, justify=tk.LEFT).pack(pady=10)
+        self.build_numpad(self.set_tab, 0, "Save PIN", self.save_pin_code)
         
         # Set initial focus
         self.pin_entry.focus_set()
@@ -139,49 +184,46 @@ class PINCodeApp:
         self.verify_entry = tk.Entry(entry_frame, textvariable=self.verify_pin, show="*", width=10, font=("Arial", 14))
         self.verify_entry.grid(row=0, column=1, padx=5, pady=5)
         
+        self.build_numpad(self.verify_tab, 1, "Verify PIN", self.verify_pin_code)
+    
+    def build_numpad(self, tab, tab_idx, action_text, action_command):
+        """Build the number pad, action button and instructions shared by both tabs"""
         # Number pad
-        numpad_frame = tk.Frame(self.verify_tab)
+        numpad_frame = tk.Frame(tab)
         numpad_frame.pack(pady=20)
         
         # Create number buttons (0-9)
-        button_font = ("Arial", 14, "bold")
         for i in range(1, 10):
             row = (i-1) // 3
             col = (i-1) % 3
-            btn = tk.Button(numpad_frame, text=str(i), width=5, height=2, font=button_font, 
-                          command=lambda num=i: self.append_digit(num),
-                          bg="light gray", relief=tk.RAISED)
+            btn = ttk.Button(numpad_frame, text=str(i), width=5, style="Numpad.TButton",
+                          command=functools.partial(self.append_digit, i))
             btn.grid(row=row, column=col, padx=5, pady=5)
-            # Use 100+i to distinguish verify tab buttons from set tab buttons
-            self.number_buttons[100+i] = btn
+            self.number_buttons[(tab_idx, i)] = btn
         
         # Button for 0
-        zero_btn = tk.Button(numpad_frame, text="0", width=5, height=2, font=button_font, 
-                command=lambda: self.append_digit(0),
-                bg="light gray", relief=tk.RAISED)
+        zero_btn = ttk.Button(numpad_frame, text="0", width=5, style="Numpad.TButton",
+                command=functools.partial(self.append_digit, 0))
         zero_btn.grid(row=3, column=1, padx=5, pady=5)
-        self.number_buttons[100] = zero_btn
+        self.number_buttons[(tab_idx, 0)] = zero_btn
         
         # Delete button (left)
-        del_btn = tk.Button(numpad_frame, text="⌫", width=5, height=2, font=button_font, 
-                command=self.delete_digit,
-                bg="light gray", relief=tk.RAISED)
+        del_btn = ttk.Button(numpad_frame, text="⌫", width=5, style="Numpad.TButton",
+                command=self.delete_digit)
         del_btn.grid(row=3, column=0, padx=5, pady=5)
-        self.number_buttons[-101] = del_btn  # Use -101 to represent delete in verify tab
+        self.number_buttons[(tab_idx, -1)] = del_btn  # Use -1 to represent delete
         
         # Clear button (right)
-        clear_btn = tk.Button(numpad_frame, text="Clear", width=5, height=2, font=button_font, 
-                command=self.clear_input,
-                bg="light gray", relief=tk.RAISED)
+        clear_btn = ttk.Button(numpad_frame, text="Clear", width=5, style="Numpad.TButton",
+                command=self.clear_input)
         clear_btn.grid(row=3, column=2, padx=5, pady=5)
-        self.number_buttons[-102] = clear_btn  # Use -102 to represent clear in verify tab
+        self.number_buttons[(tab_idx, -2)] = clear_btn  # Use -2 to represent clear
         
-        # Verify button
-        verify_btn = tk.Button(self.verify_tab, text="Verify PIN", width=15, height=2, font=("Arial", 12),
-                            command=self.verify_pin_code,
-                            bg="light gray", relief=tk.RAISED)
-        verify_btn.pack(pady=20)
-        self.number_buttons[-103] = verify_btn  # Use -103 to represent verify
+        # Save/Verify button
+        action_btn = ttk.Button(tab, text=action_text, width=15, style="Action.TButton",
+                          command=action_command)
+        action_btn.pack(pady=20)
+        self.number_buttons[(tab_idx, -3)] = action_btn  # Use -3 to represent save/verify
         
         # Instructions label
         instructions = (
@@ -191,19 +233,42 @@ class PINCodeApp:
             "• Press △ to delete\n"
             "• Press ○ to clear"
         )
-        tk.Label(self.verify_tab, text=instructions, justify=tk.LEFT).pack(pady=10)
+        tk.Label(tab, text=instructions, justify=tk.LEFT).pack(pady=10)
+    
+    def on_tab_changed(self, event):
+        """Cache the selected tab index and move the highlight onto the new tab"""
+        self.current_tab_idx = self.tab_control.index("current")
+        self.update_button_highlight()
+    
+    def show_toast(self, message, ok=True, duration=2000):
+        """Show a message for a while without blocking the event loop (unlike a messagebox)"""
+        self.toast_label.config(text=message, bg="dark green" if ok else "firebrick")
+        self.toast_label.place(relx=0.5, rely=1.0, anchor="s", y=-10)
+        self.toast_label.lift()
+        if self.toast_job is not None:
+            self.root.after_cancel(self.toast_job)
+        self.toast_job = self.root.after(duration, self.hide_toast)
+    
+    def hide_toast(self):
+        self.toast_job = None
+        self.toast_label.place_forget()
+    
+    def hash_pin(self, pin):
+        """Salted PBKDF2-SHA256 digest of a PIN; the iterations make brute-forcing short PINs slow"""
+        return hashlib.pbkdf2_hmac('sha256', pin.encode(), self.pin_salt, 100_000)
     
     def save_pin_code(self):
         if not self.set_pin.get():
-            messagebox.showerror("Error", "Please enter a PIN code")
+            self.show_toast("Please enter a PIN code", ok=False)
             return
         
         if self.set_pin.get() != self.confirm_pin.get():
-            messagebox.showerror("Error", "PIN codes do not match")
+            self.show_toast("PIN codes do not match", ok=False)
             return
         
-        self.saved_pin = self.set_pin.get()
-        messagebox.showinfo("Success", "PIN code saved successfully")
+        self.pin_salt = secrets.token_bytes(16)
+        self.saved_pin_hash = self.hash_pin(self.set_pin.get())
+        self.show_toast("PIN code saved successfully")
         # Clear inputs
         self.set_pin.set("")
         self.confirm_pin.set("")
@@ -217,71 +282,56 @@ class PINCodeApp:
     
     def verify_pin_code(self):
         if not self.verify_pin.get():
-            messagebox.showerror("Error", "Please enter a PIN code")
+            self.show_toast("Please enter a PIN code", ok=False)
             return
         
-        if not self.saved_pin:
-            messagebox.showerror("Error", "No PIN code has been saved yet")
+        if self.saved_pin_hash is None:
+            self.show_toast("No PIN code has been saved yet", ok=False)
             self.tab_control.select(0)
             return
         
-        if self.verify_pin.get() == self.saved_pin:
-            messagebox.showinfo("Success", "PIN code verified successfully")
+        # Constant-time comparison, so timing doesn't reveal how much of the PIN matched
+        if hmac.compare_digest(self.hash_pin(self.verify_pin.get()), self.saved_pin_hash):
+            self.show_toast("PIN code verified successfully")
             self.verify_pin.set("")
         else:
-            messagebox.showerror("Error", "Incorrect PIN code")
+            self.show_toast("Incorrect PIN code", ok=False)
             self.verify_pin.set("")
     
+    def focused_entry(self):
+        """Return the PIN entry that has keyboard focus, or None"""
+        focus = self.root.focus_get()
+        if focus in (self.pin_entry, self.confirm_entry, self.verify_entry):
+            return focus
+        return None
+    
     def append_digit(self, digit):
         # Get current focused entry
-        if self.root.focus_get() == self.pin_entry:
-            current_val = self.set_pin.get()
-            self.set_pin.set(current_val + str(digit))
-            self.current_focus = self.pin_entry
-        elif self.root.focus_get() == self.confirm_entry:
-            current_val = self.confirm_pin.get()
-            self.confirm_pin.set(current_val + str(digit))
-            self.current_focus = self.confirm_entry
-        elif self.root.focus_get() == self.verify_entry:
-            current_val = self.verify_pin.get()
-            self.verify_pin.set(current_val + str(digit))
-            self.current_focus = self.verify_entry
-        else:
+        entry = self.focused_entry()
+        if entry is None:
             # If no field is focused, select the appropriate one based on tab
-            if self.tab_control.index(self.tab_control.select()) == 0:
-                # Set PIN tab
-                self.pin_entry.focus_set()
-                self.current_focus = self.pin_entry
-                self.set_pin.set(str(digit))
-            else:
-                # Verify PIN tab
-                self.verify_entry.focus_set()
-                self.current_focus = self.verify_entry
-                self.verify_pin.set(str(digit))
+            entry = self.pin_entry if self.current_tab_idx == 0 else self.verify_entry
+            entry.focus_set()
+            entry.delete(0, tk.END)
+        entry.insert(tk.END, str(digit))
+        self.current_focus = entry
     
     def delete_digit(self):
         # Delete the last digit
-        if self.root.focus_get() == self.pin_entry:
-            current_val = self.set_pin.get()
-            self.set_pin.set(current_val[:-1])
-        elif self.root.focus_get() == self.confirm_entry:
-            current_val = self.confirm_pin.get()
-            self.confirm_pin.set(current_val[:-1])
-        elif self.root.focus_get() == self.verify_entry:
-            current_val = self.verify_pin.get()
-            self.verify_pin.set(current_val[:-1])
+        entry = self.focused_entry()
+        if entry is not None:
+            length = entry.index(tk.END)
+            if length:
+                entry.delete(length - 1)
     
     def clear_input(self):
         # Clear the current field
-        if self.root.focus_get() == self.pin_entry:
-            self.set_pin.set("")
-        elif self.root.focus_get() == self.confirm_entry:
-            self.confirm_pin.set("")
-        elif self.root.focus_get() == self.verify_entry:
-            self.verify_pin.set("")
+        entry = self.focused_entry()
+        if entry is not None:
+            entry.delete(0, tk.END)
     
     def switch_focus(self, direction):
-        current_tab = self.tab_control.index(self.tab_control.select())
+        current_tab = self.current_tab_idx
         
         if current_tab == 0:  # Set PIN tab
             if direction == "down":
@@ -299,277 +349,145 @@ class PINCodeApp:
     
     def move_highlight(self, direction):
         """Move the highlighted button based on direction, by using the D-pad on the DualSense controller"""
-        # Number pad layout:
-        # 1 2 3
-        # 4 5 6
-        # 7 8 9
-        # ⌫ 0 Clear
-        # save_btn
-        
-        current_number = self.selected_number
-        current_tab = self.tab_control.index(self.tab_control.select())
+        self.selected_number = NUMPAD_TRANSITIONS.get((self.selected_number, direction), self.selected_number)
         
-        # print(f"Moving highlight {direction} from {current_number} on tab {current_tab}")
-        
-        # Adjust for the current tab - if we're in verify tab and have a regular number
-        if current_tab == 1:
-            # Convert from verify tab button ID (100+) to regular number for easier logic
-            if current_number >= 100 and current_number <= 109:
-                temp_number = current_number - 100
-            elif current_number <= -100:
-                temp_number = current_number + 100
-            else:
-                temp_number = current_number
-        else:
-            temp_number = current_number
-        
-        # Movement logic
-        if direction == "up":
-            if temp_number in [1, 2, 3]:
-                # Already at top row, do nothing or wrap to bottom
-                if temp_number == 2:
-                    temp_number = 0  # Go to 0
-                elif temp_number == 1:
-                    temp_number = -1  # Go to delete
-                elif temp_number == 3:
-                    temp_number = -2  # Go to clear
-            elif temp_number in [4, 5, 6]:
-                # Go up one row
-                temp_number -= 3
-            elif temp_number in [7, 8, 9]:
-                # Go up one row
-                temp_number -= 3
-            elif temp_number == 0:
-                # From 0 go to 8
-                temp_number = 8
-            elif temp_number in [-1, -2]:  # Delete or Clear
-                # From bottom row special buttons, go to 7 or 9
-                temp_number = 7 if temp_number == -1 else 9
-            elif temp_number in [-3, -103]:  # Save/Verify button
-                # From save/verify button, go to bottom row
-                if current_tab == 0:
-                    temp_number = 0  # Go to 0 on Set PIN tab
-                else:
-                    temp_number = 0  # Go to 0 on Verify PIN tab
-            
-        elif direction == "down":
-            if temp_number in [1, 2, 3]:
-                # Go down one row
-                temp_number += 3
-            elif temp_number in [4, 5, 6]:
-                # Go down one row
-                temp_number += 3
-            elif temp_number in [7, 8, 9]:
-                # From 7/8/9 go to special bottom row
-                if temp_number == 8:
-                    temp_number = 0
-                elif temp_number == 7:
-                    temp_number = -1  # Delete
-                elif temp_number == 9:
-                    temp_number = -2  # Clear
-            elif temp_number in [0, -1, -2]:
-                # From bottom row, go to save/verify button
-                temp_number = -3 if current_tab == 0 else -103
-                
-        elif direction == "left":
-            if temp_number in [2, 3, 5, 6, 8, 9]:
-                # Not on left edge, move left
-                temp_number -= 1
-            elif temp_number == 0:
-                # From 0, go to delete
-                temp_number = -1
-            elif temp_number == -2:  # Clear
-                # From Clear, go to 0
-                temp_number = 0
-                
-        elif direction == "right":
-            if temp_number in [1, 2, 4, 5, 7, 8]:
-                # Not on right edge, move right
-                temp_number += 1
-            elif temp_number == -1:  # Delete
-                # From Delete, go to 0
-                temp_number = 0
-            elif temp_number == 0:
-                # From 0, go to Clear
-                temp_number = -2
-        
-        # Adjust back for current tab (verify tab buttons have 100 added)
-        if current_tab == 1 and temp_number >= 0 and temp_number <= 9:
-            self.selected_number = temp_number + 100
-        elif current_tab == 1 and temp_number < 0 and temp_number != -3 and temp_number != -103:
-            # For special buttons
-            self.selected_number = temp_number - 100
-        else:
-            self.selected_number = temp_number
-        
-        # print(f"New selected number: {self.selected_number}")
+        # Restyle once per idle cycle, however many moves arrive before it
+        if not self.highlight_pending:
+            self.highlight_pending = True
+            self.root.after_idle(self.flush_highlight)
+    
+    def flush_highlight(self):
+        self.highlight_pending = False
         self.update_button_highlight()
     
     def update_button_highlight(self):
         """Update the visual appearance of buttons to show which is selected"""
-        # # Add more debugging
-        # print(f"Update highlight called for number: {self.selected_number}")
-        # print(f"Available button IDs: {list(self.number_buttons.keys())}")
-        
-        # Reset all button colors - use a more explicit default color
-        for btn_id, button in self.number_buttons.items():
-            button.config(bg="light gray",fg="black", relief=tk.RAISED)
-        
-        # Highlight the selected button with a more noticeable color
-        if self.selected_number in self.number_buttons:
-            selected_button = self.number_buttons[self.selected_number]
-            # Use a much more noticeable color and effect
-            selected_button.config(bg="light gray", fg="red", relief=tk.SUNKEN)
-            
-            # Force update the UI
-            self.root.update_idletasks()
+        current_tab = self.current_tab_idx
+        selected_button = self.number_buttons.get((current_tab, self.selected_number))
+        if selected_button is self.highlighted_button:
+            return
+        
+        # Reset the previously highlighted button to its normal style
+        if self.highlighted_button is not None:
+            self.highlighted_button.configure(style=self.highlighted_style)
+        self.highlighted_button = selected_button
+        
+        # Highlight the selected button on the current tab with the "Selected." variant of its style
+        if selected_button is not None:
+            self.highlighted_style = "Action.TButton" if self.selected_number == -3 else "Numpad.TButton"
+            selected_button.configure(style="Selected." + self.highlighted_style)
         else:
-            print(f"WARNING: Button {self.selected_number} not found in buttons dictionary!")
+            logger.warning("Button %s not found in buttons dictionary", self.selected_number)
     
     def handle_selected_button(self):
         """Handle the currently selected button action"""
         current_number = self.selected_number
-        current_tab = self.tab_control.index(self.tab_control.select())
-        
-        # Adjust for verify tab
-        if current_tab == 1 and current_number >= 0 and current_number <= 9:
-            # Convert back from 100+ to actual number
-            digit = current_number - 100
-            self.append_digit(digit)
-        elif current_tab == 0 and current_number >= 0 and current_number <= 9:
-            # Normal digit in set tab
+        
+        if 0 <= current_number <= 9:
             self.append_digit(current_number)
-        elif current_number in [-1, -101]:
+        elif current_number == -1:
             # Delete button
             self.delete_digit()
-        elif current_number in [-2, -102]:
+        elif current_number == -2:
             # Clear button
             self.clear_input()
         elif current_number == -3:
-            # Save button (set tab)
-            self.save_pin_code()
-        elif current_number == -103:
-            # Verify button (verify tab)
-            self.verify_pin_code()
+            # Save button (set tab) or verify button (verify tab)
+            if self.current_tab_idx == 0:
+                self.save_pin_code()
+            else:
+                self.verify_pin_code()
     
     def initialize_controller(self):
+        """Connect to the controller on a worker thread so the window can draw meanwhile"""
+        self.controller_init_thread = threading.Thread(target=self.connect_controller, name="pad-init")
+        self.controller_init_thread.daemon = True
+        self.controller_init_thread.start()
+        self.root.after(50, self.finish_controller_init)
+    
+    def connect_controller(self):
+        """Worker thread: open the controller (USB enumeration can take a while) and start the collector"""
         try:
-            self.dualsense = pydualsense()
-            self.dualsense.init()
+            dualsense = pydualsense()
+            dualsense.init()
+            self.dualsense = dualsense
 
             # init the collector
             self.collector = DualSenseDataCollector(controller=self.dualsense, user_id="user1")
             # start collection
             self.collector.start_collection()
-
-
-            # Start controller input thread
-            self.controller_running = True
-            self.controller_thread = threading.Thread(target=self.controller_loop)
-            self.controller_thread.daemon = True
-            self.controller_thread.start()
             
         except Exception as e:
-            print(f"Error initializing DualSense controller: {e}")
-            messagebox.showwarning("Controller Warning", 
-                                "DualSense controller not detected. You can still use the on-screen buttons.")
+            self.controller_init_error = e
     
-    def controller_loop(self):
-        # Track button states to detect press events (not holds)
-        button_states = {
-            'cross': False,
-            'triangle': False,
-            'circle': False,
-            'dpad_up': False,
-            'dpad_down': False,
-            'dpad_left': False,
-            'dpad_right': False,
-            'rectangle': False  # Added rectangle button state
-        }
-        
-        while self.controller_running:
+    def finish_controller_init(self):
+        """Once connect_controller is done, wire up the controller events on the Tk thread"""
+        if self.controller_init_thread.is_alive():
+            self.root.after(50, self.finish_controller_init)
+            return
+        
+        if self.controller_init_error is not None:
+            logger.warning("Error initializing DualSense controller: %s", self.controller_init_error)
+            self.show_toast("DualSense controller not detected. You can still use the on-screen buttons.",
+                            ok=False, duration=5000)
+            return
+        
+        # Queue every press and release pydualsense reports for the Tk thread
+        for bit_index, (event_name, _, _, _) in enumerate(self.button_table):
+            event = getattr(self.dualsense, event_name)
+            event += functools.partial(self.on_controller_event, bit_index)
+        
+        # Apply the controller events on the Tk thread
+        self.controller_connected = True
+        self.drain_controller_events()
+    
+    def on_controller_event(self, bit_index, is_pressed):
+        """Called from the pydualsense report thread on every press and release"""
+        self.controller_events.put((bit_index, is_pressed))
+    
+    def drain_controller_events(self):
+        """Apply every press and release pydualsense reported since the last tick"""
+        # Reschedule first, so an error in one action doesn't stop the controller for good.
+        # About one tick per frame while the window has focus, much slower when backgrounded
+        if self.controller_connected:
+            self.root.after(16 if self.window_active else 200, self.drain_controller_events)
+        
+        # Drain every queued transition, in order, so no press is collapsed away
+        while True:
             try:
-                # Get controller state
-                # Handle D-pad for navigation
-                if self.dualsense.state.DpadUp:
-                    if not button_states['dpad_up']:
-                        button_states['dpad_up'] = True
-                        print("Button pressed: D-pad UP")
-                        self.root.after(0, self.move_highlight, "up")
-                else:
-                    button_states['dpad_up'] = False
-                
-                if self.dualsense.state.DpadDown:
-                    if not button_states['dpad_down']:
-                        button_states['dpad_down'] = True
-                        print("Button pressed: D-pad DOWN")
-                        self.root.after(0, self.move_highlight, "down")
-                else:
-                    button_states['dpad_down'] = False
-                
-                if self.dualsense.state.DpadLeft:
-                    if not button_states['dpad_left']:
-                        button_states['dpad_left'] = True
-                        print("Button pressed: D-pad LEFT")
-                        self.root.after(0, self.move_highlight, "left")
-                else:
-                    button_states['dpad_left'] = False
-                
-                if self.dualsense.state.DpadRight:
-                    if not button_states['dpad_right']:
-                        button_states['dpad_right'] = True
-                        print("Button pressed: D-pad RIGHT")
-                        self.root.after(0, self.move_highlight, "right")
-                else:
-                    button_states['dpad_right'] = False
-                
-                # Handle cross button (confirm/enter number)
-                if self.dualsense.state.cross:
-                    if not button_states['cross']:
-                        button_states['cross'] = True
-                        print("Button pressed: CROSS")
-                        # Handle the current selection
-                        self.root.after(0, self.handle_selected_button)
-                else:
-                    button_states['cross'] = False
-                
-                # Handle triangle button (delete)
-                if self.dualsense.state.triangle:
-                    if not button_states['triangle']:
-                        button_states['triangle'] = True
-                        print("Button pressed: TRIANGLE")
-                        self.root.after(0, self.delete_digit)
-                else:
-                    button_states['triangle'] = False
-                
-                # Handle circle button (clear)
-                if self.dualsense.state.circle:
-                    if not button_states['circle']:
-                        button_states['circle'] = True
-                        print("Button pressed: CIRCLE")
-                        self.root.after(0, self.clear_input)
-                else:
-                    button_states['circle'] = False
-                
-                # Handle rectangle button (switch text field focus)
-                if self.dualsense.state.square:
-                    if not button_states['rectangle']:
-                        button_states['rectangle'] = True
-                        print("Button pressed: RECTANGLE/SQUARE")
-                        self.root.after(0, self.switch_text_field)
-                else:
-                    button_states['rectangle'] = False
-                
-                # Sleep to prevent high CPU usage
-                time.sleep(0.05)
-                
-            except Exception as e:
-                print(f"Error reading controller input: {e}")
-                time.sleep(1)  # Longer sleep on error
+                bit_index, is_pressed = self.controller_events.get_nowait()
+            except queue.Empty:
+                break
+            
+            bit = 1 << bit_index
+            new_mask = self.pressed_mask | bit if is_pressed else self.pressed_mask & ~bit
+            rising = new_mask & ~self.pressed_mask
+            self.pressed_mask = new_mask
+            if not rising:
+                if not is_pressed:
+                    self.next_repeat.pop(bit_index, None)
+                continue
+            
+            _, message, action, args = self.button_table[bit_index]
+            logger.debug("Button pressed: %s", message)
+            action(*args)
+            if bit & self.repeat_mask:
+                self.next_repeat[bit_index] = time.monotonic() + self.repeat_delay
+        
+        # Repeat held directions that are due, at most once per tick each
+        now = time.monotonic()
+        for bit_index, due in self.next_repeat.items():
+            if due <= now:
+                _, message, action, args = self.button_table[bit_index]
+                logger.debug("Button repeat: %s", message)
+                action(*args)
+                # Keep the cadence, but don't burst to catch up after a late tick
+                due += self.repeat_interval
+                self.next_repeat[bit_index] = due if due > now else now + self.repeat_interval
     
     def switch_text_field(self):
         """Switch focus between text fields in the current tab"""
-        current_tab = self.tab_control.index(self.tab_control.select())
+        current_tab = self.current_tab_idx
         
         if current_tab == 0:  # Set PIN tab
             if self.current_focus == self.pin_entry:
@@ -584,14 +502,20 @@ class PINCodeApp:
             self.current_focus = self.verify_entry
     
     def on_closing(self):
-        # Cleanup controller
-        self.controller_running = False
-        if hasattr(self, 'dualsense'):
+        # Cleanup controller: stop draining its events and let a pending init finish first
+        self.controller_connected = False
+        if self.controller_init_thread is not None:
+            self.controller_init_thread.join(timeout=1.0)
+        if self.collector is not None:
             try:
                 self.collector.stop_collection()
+            except Exception as e:
+                logger.warning("Error stopping data collection: %s", e)
+        if self.dualsense is not None:
+            try:
                 self.dualsense.close()
-            except:
-                pass
+            except Exception as e:
+                logger.warning("Error closing DualSense controller: %s", e)
         
         self.root.destroy()
 
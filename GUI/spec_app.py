@@ -3,9 +3,9 @@ from tkinter import ttk, filedialog, messagebox
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import numpy as np
-import soundfile as sf
-from scipy import signal
+from scipy import fft
 import os
+import concurrent.futures
 from tkinterdnd2 import DND_FILES, TkinterDnD
 import librosa
 
@@ -16,10 +16,34 @@ class SpecApp:
         self.root.geometry("1000x800")
         
         # Audio data
-        self.audio_data = None
+        self.audio_data = None  # Mono, float32, at analysis_rate
         self.sample_rate = None
         self.filename = None
         
+        # Loading and analysis run on a worker so the window stays responsive;
+        # only the most recently requested load is applied
+        self.load_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.load_future = None
+        
+        # Spectrogram/MFCC features of the loaded file (which goes with audio_data), keyed by
+        # (path, mtime, analysis rate) so reloading an unchanged file skips decoding and analysis
+        self.features_key = None
+        self.features = None
+        
+        # Files are resampled to this rate on load (None keeps each file's own rate).
+        # 16 kHz still shows everything up to 8 kHz, at a fraction of the STFT work.
+        self.analysis_rate = 16000
+        
+        # STFT parameters shared by the spectrogram and the MFCC
+        self.n_fft = 2048
+        self.hop_length = 512
+        
+        # MFCC = first n_mfcc rows of the orthonormal DCT-II of the log-mel spectrogram
+        # (what librosa.feature.mfcc computes), as a fixed matrix built once
+        self.n_mels = 128
+        self.n_mfcc = 20
+        self.mfcc_dct = fft.dct(np.eye(self.n_mels, dtype=np.float32), type=2, norm='ortho', axis=0)[:self.n_mfcc]
+        
         # Create main frame
         self.main_frame = ttk.Frame(root, padding=10)
         self.main_frame.pack(expand=True, fill="both")
@@ -54,10 +78,12 @@ class SpecApp:
         
         # Create matplotlib figure with three subplots
         self.fig, (self.ax1, self.ax2, self.ax3) = plt.subplots(3, 1, figsize=(10, 12))
-        self.fig.subplots_adjust(hspace=0.5)
+        # Fixed margins, set once: re-running tight_layout per file re-measures every tick label
+        self.fig.subplots_adjust(left=0.08, right=0.97, top=0.95, bottom=0.06, hspace=0.5)
         
         # Create canvas for the figure
         self.canvas = FigureCanvasTkAgg(self.fig, master=plot_frame)
+        self.canvas.get_tk_widget().configure(highlightthickness=0)
         self.canvas.get_tk_widget().pack(expand=True, fill="both")
         
         # Initialize empty plots
@@ -73,6 +99,14 @@ class SpecApp:
         self.ax3.set_xlabel("Time (s)")
         self.ax3.set_ylabel("MFCC Coefficients")
         
+        # Artists are created once and only get new data per file (see update_plots)
+        self.wave_line, = self.ax1.plot([], [], linewidth=0.8)
+        self.ax1.grid(True)
+        # No grid on the images: it would be drawn over the data
+        self.spec_image = self.ax2.imshow(np.zeros((1, 1)), aspect='auto', origin='lower',
+                                          interpolation='nearest')
+        self.mfcc_image = self.ax3.imshow(np.zeros((1, 1)), aspect='auto', origin='lower')
+        
         self.canvas.draw()
     
     def handle_drop(self, event):
@@ -105,65 +139,155 @@ class SpecApp:
         return os.path.splitext(file_path)[1].lower() in audio_extensions
     
     def load_audio_file(self, file_path):
+        # Drop the previous load if it hasn't started yet; if it has, its result is ignored
+        if self.load_future is not None:
+            self.load_future.cancel()
+        
+        self.drop_label.config(text=f"Loading {os.path.basename(file_path)}...")
+        
+        # Reuse the decoded audio and features when this exact file was analysed already
         try:
-            # Load audio file
-            self.audio_data, self.sample_rate = sf.read(file_path)
-            self.filename = os.path.basename(file_path)
-            
-            # Update drop zone label
-            self.drop_label.config(text=f"Loaded: {self.filename}")
-            
-            # Update plots
-            self.update_plots()
-            
+            key = (os.path.abspath(file_path), os.path.getmtime(file_path), self.analysis_rate)
+        except OSError:
+            key = None
+        if key is not None and key == self.features_key:
+            cached = (self.audio_data, self.sample_rate, self.features)
+        else:
+            cached = None
+        
+        future = self.load_executor.submit(self.read_and_analyse, file_path, key, cached)
+        self.load_future = future
+        self.root.after(50, self.apply_loaded_audio, future)
+    
+    def read_and_analyse(self, file_path, key, cached):
+        """Worker thread: load the file and compute its features (no Tk calls here)"""
+        if cached is not None:
+            audio_data, sample_rate, features = cached
+        else:
+            audio_data, sample_rate = librosa.load(file_path, sr=self.analysis_rate, mono=True, dtype=np.float32)
+            features = self.compute_features(audio_data, sample_rate)
+        return file_path, audio_data, sample_rate, key, features
+    
+    def apply_loaded_audio(self, future):
+        """Show a finished load, unless a newer one has been requested since"""
+        if future is not self.load_future or future.cancelled():
+            return
+        # Polled from Tk so the worker never calls into Tk itself
+        if not future.done():
+            self.root.after(50, self.apply_loaded_audio, future)
+            return
+        self.load_future = None
+        
+        try:
+            file_path, audio_data, sample_rate, key, features = future.result()
         except Exception as e:
+            # Go back to showing what was loaded before
+            if self.filename:
+                self.drop_label.config(text=f"Loaded: {self.filename}")
+            else:
+                self.drop_label.config(text="Drag and drop an audio file here\nor click to browse")
             messagebox.showerror("Error", f"Failed to load audio file: {str(e)}")
+            return
+        
+        self.audio_data = audio_data
+        self.sample_rate = sample_rate
+        self.filename = os.path.basename(file_path)
+        self.features_key = key
+        self.features = features
+        
+        # Update drop zone label
+        self.drop_label.config(text=f"Loaded: {self.filename}")
+        
+        # Update plots
+        self.update_plots()
+    
+    def compute_features(self, audio_data, sample_rate):
+        """Spectrogram and MFCC from a single power STFT"""
+        S = np.abs(librosa.stft(audio_data, n_fft=self.n_fft, hop_length=self.hop_length))
+        np.square(S, out=S)
+        f = librosa.fft_frequencies(sr=sample_rate, n_fft=self.n_fft)
+        t = librosa.frames_to_time(np.arange(S.shape[1]), sr=sample_rate, hop_length=self.hop_length)
+        
+        # Passing S= makes librosa reuse this STFT instead of computing another one
+        mel = librosa.feature.melspectrogram(S=S, sr=sample_rate, n_mels=self.n_mels)
+        mfccs = self.mfcc_dct @ self.power_to_db_inplace(mel)
+        
+        # S isn't needed as power any more, so it becomes the dB spectrogram itself
+        return {
+            'f': f,
+            't': t,
+            'spectrogram_db': self.power_to_db_inplace(S),
+            'mfccs': mfccs,
+        }
+    
+    def power_to_db_inplace(self, S, amin=1e-10, top_db=80.0):
+        """librosa.power_to_db (ref=1.0) computed in place in S, without temporary arrays"""
+        np.maximum(S, amin, out=S)
+        np.log10(S, out=S)
+        S *= 10.0
+        # Limit the dynamic range to top_db below the peak, like librosa
+        np.maximum(S, S.max() - top_db, out=S)
+        return S
     
     def update_plots(self):
         if self.audio_data is None:
             return
         
-        # Clear previous plots
-        self.ax1.clear()
-        self.ax2.clear()
-        self.ax3.clear()
+        audio_data = self.audio_data
+        features = self.features
+        duration = len(audio_data) / self.sample_rate
         
-        # Convert stereo to mono if needed
-        if len(self.audio_data.shape) > 1:
-            audio_data = np.mean(self.audio_data, axis=1)
+        # Plot waveform; with far more samples than pixels, draw a min/max envelope instead:
+        # one vertical stroke per pixel column, from the column's minimum to its maximum
+        n_bins = int(self.ax1.bbox.width) or 2000
+        if len(audio_data) > 4 * n_bins:
+            bin_size = len(audio_data) // n_bins
+            blocks = audio_data[:bin_size * n_bins].reshape(n_bins, bin_size)
+            time = np.repeat((np.arange(n_bins) + 0.5) * bin_size / self.sample_rate, 2)
+            values = np.column_stack((blocks.min(axis=1), blocks.max(axis=1))).ravel()
         else:
-            audio_data = self.audio_data
-        
-        # Create time array
-        time = np.arange(len(audio_data)) / self.sample_rate
-        
-        # Plot waveform
-        self.ax1.plot(time, audio_data)
+            time = np.arange(len(audio_data)) / self.sample_rate
+            values = audio_data
+        self.wave_line.set_data(time, values)
+        self.ax1.relim()
+        self.ax1.autoscale_view()
         self.ax1.set_title(f"Waveform - {self.filename}")
-        self.ax1.set_xlabel("Time (s)")
-        self.ax1.set_ylabel("Amplitude")
-        self.ax1.grid(True)
         
-        # Plot spectrogram
-        f, t, Sxx = signal.spectrogram(audio_data, self.sample_rate)
-        self.ax2.pcolormesh(t, f, 10 * np.log10(Sxx), shading='auto')
+        # Plot spectrogram as an image; t and f are bin centres, so the extent
+        # reaches half a bin beyond them on each side
+        t, f, spectrogram_db = features['t'], features['f'], features['spectrogram_db']
+        half_t = self.hop_length / self.sample_rate / 2
+        half_f = self.sample_rate / self.n_fft / 2
+        extent = (t[0] - half_t, t[-1] + half_t, f[0] - half_f, f[-1] + half_f)
+        self.spec_image.set_data(spectrogram_db)
+        self.spec_image.set_extent(extent)
+        self.spec_image.set_clim(spectrogram_db.min(), spectrogram_db.max())
+        self.ax2.set_xlim(extent[0], extent[1])
+        self.ax2.set_ylim(extent[2], extent[3])
         self.ax2.set_title(f"Spectrogram - {self.filename}")
-        self.ax2.set_xlabel("Time (s)")
-        self.ax2.set_ylabel("Frequency (Hz)")
-        self.ax2.grid(True)
         
         # Plot MFCC
-        mfccs = librosa.feature.mfcc(y=audio_data, sr=self.sample_rate)
-        self.ax3.imshow(mfccs, aspect='auto', origin='lower')
+        mfccs = features['mfccs']
+        self.mfcc_image.set_data(mfccs)
+        self.mfcc_image.set_extent((0, duration, 0, mfccs.shape[0]))
+        self.mfcc_image.set_clim(mfccs.min(), mfccs.max())
+        self.ax3.set_xlim(0, duration)
+        self.ax3.set_ylim(0, mfccs.shape[0])
         self.ax3.set_title(f"MFCC - {self.filename}")
-        self.ax3.set_xlabel("Time (s)")
-        self.ax3.set_ylabel("MFCC Coefficients")
         
-        # Adjust layout and redraw
-        self.fig.tight_layout()
-        self.canvas.draw()
+        # Redraw once Tk is idle
+        self.canvas.draw_idle()
+    
+    def on_closing(self):
+        # Cleanup: drop a pending load without waiting for one that is running
+        if self.load_future is not None:
+            self.load_future.cancel()
+            self.load_future = None
+        self.load_executor.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
 
 if __name__ == "__main__":
     root = TkinterDnD.Tk()  # Use TkinterDnD's Tk instead of tkinter's
     app = SpecApp(root)
+    root.protocol("WM_DELETE_WINDOW", app.on_closing)
     root.mainloop()